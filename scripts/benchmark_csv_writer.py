@@ -0,0 +1,72 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+import pandas as pd
+import csv_writer
+
+# Benchmarks csv_writer.write_csv against plain DataFrame.to_csv on a season's
+# gameweek and tournament files. Output correctness is checked separately by
+# scripts/verify_csv_writer.py.
+SEASON = sys.argv[1] if len(sys.argv) > 1 else "2025-2026"
+SEASON_PATH = os.path.join('data', SEASON)
+
+
+def load_frames():
+    """Reads every per-gameweek CSV of the season into memory, keyed by relative path."""
+    frames = {}
+    for path in sorted(glob.glob(os.path.join(SEASON_PATH, 'By *', '**', '*.csv'), recursive=True)):
+        frames[os.path.relpath(path, SEASON_PATH)] = pd.read_csv(path)
+    return frames
+
+
+def run_to_csv(frames, out_dir):
+    start = time.perf_counter()
+    for rel_path, df in frames.items():
+        path = os.path.join(out_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path, index=False)
+    return time.perf_counter() - start
+
+
+def run_write_csv(frames, out_dir):
+    start = time.perf_counter()
+    for rel_path, df in frames.items():
+        path = os.path.join(out_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        csv_writer.write_csv(df, path)
+    return time.perf_counter() - start
+
+
+def main():
+    if not os.path.isdir(SEASON_PATH):
+        print(f"❌ Error: Season folder not found: {SEASON_PATH}")
+        sys.exit(1)
+
+    frames = load_frames()
+    print(f"Loaded {len(frames)} CSV files from {SEASON_PATH}")
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        baseline_dir = os.path.join(work_dir, 'to_csv')
+        writer_dir = os.path.join(work_dir, 'write_csv')
+        csv_writer.MANIFEST_PATH = os.path.join(work_dir, 'manifest.json')
+
+        baseline_time = run_to_csv(frames, baseline_dir)
+        cold_time = run_write_csv(frames, writer_dir)
+        populate_time = run_write_csv(frames, writer_dir)
+        warm_time = run_write_csv(frames, writer_dir)
+
+        print(f"  DataFrame.to_csv            : {baseline_time:.2f}s")
+        print(f"  write_csv (no manifest)     : {cold_time:.2f}s")
+        print(f"  write_csv (first fingerprint): {populate_time:.2f}s")
+        print(f"  write_csv (unchanged data)  : {warm_time:.2f}s "
+              f"({baseline_time / max(warm_time, 1e-9):.1f}x faster than to_csv)")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+MANIFEST_PATH = os.path.join('data', '.csv_manifest.json')
+
+logger = logging.getLogger(__name__)
+
+# Fingerprints of the frames behind every CSV written so far, keyed by path.
+# Loaded lazily on first write and persisted by flush_manifest().
+_manifest = None
+_stats = {'written': 0, 'skipped': 0}
+
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        _manifest = {}
+        if os.path.exists(MANIFEST_PATH):
+            try:
+                with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                    _manifest = json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"  > Could not read {MANIFEST_PATH}, starting with an empty manifest.")
+    return _manifest
+
+
+def _manifest_key(path):
+    return os.path.normpath(os.path.relpath(path)).replace(os.sep, '/')
+
+
+def frame_fingerprint(df: pd.DataFrame, **to_csv_kwargs):
+    """
+    Returns a hash of the frame's values, column names, dtypes and the to_csv
+    options, or None if the frame holds unhashable values (lists, dicts).
+    Numeric columns are hashed as raw buffers, one block per dtype, so wide
+    stat tables cost a handful of array copies rather than a pass per column.
+    """
+    h = hashlib.sha1()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    h.update(repr(sorted(to_csv_kwargs.items())).encode())
+
+    positions_by_dtype = {}
+    for position, dtype in enumerate(df.dtypes):
+        positions_by_dtype.setdefault(dtype, []).append(position)
+
+    try:
+        for dtype, positions in positions_by_dtype.items():
+            block = df.iloc[:, positions]
+            if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+                h.update(np.ascontiguousarray(block.to_numpy()).tobytes())
+            else:
+                h.update(pd.util.hash_pandas_object(block, index=False, categorize=False).to_numpy().tobytes())
+    except TypeError:
+        return None
+    return h.hexdigest()
+
+
+def write_csv(df: pd.DataFrame, path, **to_csv_kwargs):
+    """
+    Drop-in replacement for df.to_csv(path, index=False) used by all scripts.
+
+    A file with no manifest entry is written with a plain to_csv. Once a file
+    has an entry, the frame is fingerprinted; if it matches the fingerprint
+    recorded for the file (and the file still has the recorded size) nothing is
+    rendered or written, so untouched gameweek files keep their bytes and
+    modification times.
+    Returns True if the file was (re)written.
+    """
+    manifest = _load_manifest()
+    key = _manifest_key(path)
+    entry = manifest.get(key)
+
+    fingerprint = None
+    if entry is not None and os.path.exists(path) and os.path.getsize(path) == entry['size']:
+        fingerprint = frame_fingerprint(df, **to_csv_kwargs)
+        if fingerprint is not None and fingerprint == entry['fingerprint']:
+            _stats['skipped'] += 1
+            return False
+
+    df.to_csv(path, index=False, **to_csv_kwargs)
+    _stats['written'] += 1
+    # A first write records no fingerprint; the next write of this path fills it in
+    manifest[key] = {'fingerprint': fingerprint, 'size': os.path.getsize(path)}
+    return True
+
+
+def flush_manifest():
+    """Persists the fingerprint manifest and logs how many writes were avoided."""
+    if _manifest is None:
+        return
+    os.makedirs(os.path.dirname(MANIFEST_PATH) or '.', exist_ok=True)
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(_manifest, f, indent=0, sort_keys=True)
+    logger.info(f"  > CSV writer: {_stats['written']} written, {_stats['skipped']} skipped via fingerprint.")
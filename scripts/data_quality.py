@@ -0,0 +1,158 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+REPORT_FILENAME = 'data_quality_report.json'
+MAX_EXAMPLES = 10
+# A gameweek whose row count falls outside this fraction of the season median is flagged
+ROW_COUNT_TOLERANCE = (0.5, 1.5)
+
+logger = logging.getLogger(__name__)
+
+
+def _result(name, table, violations, examples=None, **details):
+    """Builds one check entry for the report."""
+    return {
+        'check': name,
+        'table': table,
+        'status': 'pass' if violations == 0 else 'fail',
+        'violations': int(violations),
+        'examples': (examples or [])[:MAX_EXAMPLES],
+        **details,
+    }
+
+
+def _records(df):
+    """Converts a small frame into JSON-safe example records."""
+    return json.loads(df.head(MAX_EXAMPLES).to_json(orient='records'))
+
+
+def check_cumulative_monotonic(playerstats_df, non_decreasing_cols):
+    """
+    Flags columns that decrease for a player from one GW to the next. Only pass
+    columns that can never legitimately go down; signed totals such as
+    total_points would otherwise fail on every negative gameweek score.
+    """
+    cols = [col for col in non_decreasing_cols if col in playerstats_df.columns]
+    if playerstats_df.empty or not cols or not {'id', 'gw'} <= set(playerstats_df.columns):
+        return _result('cumulative_monotonic', 'playerstats', 0)
+
+    ordered = playerstats_df[['id', 'gw'] + cols].sort_values(['id', 'gw'], kind='stable')
+    values = ordered[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    ids = ordered['id'].to_numpy()
+
+    # Compare every row with the previous one; only rows of the same player count
+    same_player = np.zeros(len(ordered), dtype=bool)
+    same_player[1:] = ids[1:] == ids[:-1]
+    prev = np.roll(values, 1, axis=0)
+    decreased = (values < prev) & same_player[:, None]
+
+    row_idx, col_idx = np.nonzero(decreased)
+    examples = pd.DataFrame({
+        'id': ids[row_idx],
+        'gw': ordered['gw'].to_numpy()[row_idx],
+        'column': np.asarray(cols, dtype=object)[col_idx],
+        'previous': prev[row_idx, col_idx],
+        'current': values[row_idx, col_idx],
+    })
+    per_column = {col: int(n) for col, n in zip(cols, decreased.sum(axis=0)) if n}
+    return _result('cumulative_monotonic', 'playerstats', len(row_idx), _records(examples),
+                   by_column=per_column)
+
+
+def check_match_references(playermatchstats_df, matches_df):
+    """Flags playermatchstats rows whose match_id does not exist in matches."""
+    if playermatchstats_df.empty or 'match_id' not in playermatchstats_df.columns:
+        return _result('match_id_exists', 'playermatchstats', 0)
+
+    orphaned = ~playermatchstats_df['match_id'].isin(matches_df['match_id'])
+    orphan_ids = playermatchstats_df.loc[orphaned, 'match_id'].value_counts()
+    examples = [{'match_id': match_id, 'rows': int(n)} for match_id, n in orphan_ids.items()]
+    return _result('match_id_exists', 'playermatchstats', orphaned.sum(), examples,
+                   distinct_match_ids=int(len(orphan_ids)))
+
+
+def check_unique_keys(df, table, key_cols):
+    """Flags rows that share the same key columns."""
+    if df.empty or not set(key_cols) <= set(df.columns):
+        return _result(f"unique_{'_'.join(key_cols)}", table, 0)
+
+    duplicated = df.duplicated(subset=key_cols, keep=False)
+    dupes = df.loc[duplicated, key_cols].value_counts().rename('rows').reset_index()
+    return _result(f"unique_{'_'.join(key_cols)}", table, duplicated.sum(), _records(dupes))
+
+
+def check_rows_per_gameweek(counts, table):
+    """Flags gameweeks whose row count is far from the season median."""
+    if counts.empty:
+        return _result('rows_per_gameweek', table, 0)
+
+    median = counts.median()
+    low, high = ROW_COUNT_TOLERANCE[0] * median, ROW_COUNT_TOLERANCE[1] * median
+    outliers = counts[(counts < low) | (counts > high)]
+    examples = [{'gw': int(gw), 'rows': int(n)} for gw, n in outliers.items()]
+    return _result('rows_per_gameweek', table, len(outliers), examples,
+                   median_rows=float(median), expected_range=[float(low), float(high)])
+
+
+def finished_gameweeks(gameweeks_df):
+    """Returns the ids of gameweeks flagged finished, or None if the table doesn't say."""
+    if gameweeks_df is None or not {'id', 'finished'} <= set(gameweeks_df.columns):
+        return None
+    finished = gameweeks_df['finished'].astype(str).str.lower() == 'true'
+    return set(gameweeks_df.loc[finished, 'id'].dropna().astype(int))
+
+
+def run_checks(playerstats_df, matches_df, playermatchstats_df, non_decreasing_cols, gameweeks_df=None):
+    """
+    Runs every invariant once over the whole season and returns the list of results.
+    The row-count checks only look at finished gameweeks (when `gameweeks_df` is
+    given), since an open gameweek is expected to be short of rows.
+    """
+    results = [
+        check_cumulative_monotonic(playerstats_df, non_decreasing_cols),
+        check_match_references(playermatchstats_df, matches_df),
+        check_unique_keys(playermatchstats_df, 'playermatchstats', ['player_id', 'match_id']),
+        check_unique_keys(playerstats_df, 'playerstats', ['id', 'gw']),
+    ]
+
+    finished = finished_gameweeks(gameweeks_df)
+    if 'gw' in playerstats_df.columns:
+        counts = playerstats_df['gw'].value_counts().sort_index()
+        if finished is not None:
+            counts = counts[counts.index.isin(finished)]
+        results.append(check_rows_per_gameweek(counts, 'playerstats'))
+    if {'match_id', 'gameweek'} <= set(matches_df.columns) and 'match_id' in playermatchstats_df.columns:
+        match_gw = playermatchstats_df['match_id'].map(matches_df.drop_duplicates('match_id').set_index('match_id')['gameweek'])
+        counts = match_gw.dropna().astype(int).value_counts().sort_index()
+        if finished is not None:
+            counts = counts[counts.index.isin(finished)]
+        # GW0 holds pre-season friendlies, which are never exported
+        results.append(check_rows_per_gameweek(counts[counts.index > 0], 'playermatchstats'))
+    return results
+
+
+def write_report(results, output_dir, season):
+    """
+    Writes the machine-readable report and logs a one-line summary per failing
+    check. The report carries no timestamp, so it only changes when the data does.
+    """
+    report = {
+        'season': season,
+        'passed': all(r['status'] == 'pass' for r in results),
+        'checks': results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, REPORT_FILENAME)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        if r['status'] == 'fail':
+            logger.warning(f"  > ⚠️  {r['table']}: {r['check']} failed with {r['violations']} violation(s).")
+    failed = sum(r['status'] == 'fail' for r in results)
+    logger.info(f"  > {len(results) - failed}/{len(results)} checks passed. Report written to {report_path}")
+    return report
@@ -2,10 +2,19 @@
 
 import os
 import sys
+import ast
+import json
+import time
+import argparse
+import numpy as np
 import pandas as pd
 from supabase import create_client, Client
 import logging
 from datetime import datetime, timezone
+from player_index import update_index
+from csv_writer import write_csv, flush_manifest
+from data_quality import run_checks, write_report
+from player_aggregates import update_player_aggregates
 
 # --- Configuration ---
 SEASON = "2025-2026"
@@ -23,6 +32,29 @@ TOURNAMENT_NAME_MAP = {
     'conference-league' : 'Conference League'
 }
 
+# Integer surrogate keys for tournaments, in TOURNAMENT_NAME_MAP order. Longer
+# slugs are tried first when parsing so 'premier-league' is never read as 'prem'.
+TOURNAMENT_SLUGS = list(TOURNAMENT_NAME_MAP.keys())
+TOURNAMENT_KEYS = {slug: key for key, slug in enumerate(TOURNAMENT_SLUGS)}
+_TOURNAMENT_PATTERN = '|'.join(sorted(TOURNAMENT_SLUGS, key=len, reverse=True))
+MATCH_ID_PATTERN = rf'^(?P<season>\d{{2}}-\d{{2}})-(?P<tournament>{_TOURNAMENT_PATTERN})-(?P<home_slug>.+?)-vs-(?P<away_slug>.+)$'
+MATCH_KEY_COLS = ['match_key', 'tournament_key']
+
+# --- Watch mode ---
+TABLE_NAMES = ['gameweeks', 'players', 'playerstats', 'teams', 'matches', 'playermatchstats']
+# Columns that identify a row in each table, used to spot changed rows between polls
+TABLE_KEYS = {
+    'gameweeks': ['id'],
+    'players': ['player_id'],
+    'playerstats': ['id', 'gw'],
+    'teams': ['id'],
+    'matches': ['match_id'],
+    'playermatchstats': ['player_id', 'match_id'],
+}
+LIVE_POLL_SECONDS = 120         # while a current-GW match is in progress
+IDLE_POLL_SECONDS = 30 * 60     # otherwise, unless a kickoff comes sooner
+FULL_REFRESH_SECONDS = 6 * 3600 # re-fetch every table in full at least this often
+
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -37,6 +69,11 @@ CUMULATIVE_COLS = [
     'influence', 'creativity', 'threat', 'ict_index', 'tackles',
     'clearances_blocks_interceptions', 'recoveries', 'defensive_contribution'
 ]
+# Cumulative columns the quality report requires to never decrease between gameweeks.
+# total_points and bps fall when a player scores negative points in a gameweek, and
+# FPL's transfer counters restart after GW1's pre-season squad picks.
+NON_DECREASING_COLS = [col for col in CUMULATIVE_COLS
+                       if col not in {'total_points', 'bps', 'transfers_in', 'transfers_out'}]
 ID_COLS = ['id', 'first_name', 'second_name', 'web_name']
 SNAPSHOT_COLS = [
     'status', 'news', 'news_added', 'now_cost', 'now_cost_rank', 'now_cost_rank_type',
@@ -55,6 +92,12 @@ SNAPSHOT_COLS = [
     'goals_conceded_per_90', 'starts_per_90', 'defensive_contribution_per_90', 'gw'
 ]
 
+# --- Nested gameweek_summaries columns and the child tables they are normalized into ---
+GAMEWEEK_NESTED_COLS = ['chip_plays', 'top_element_info', 'overrides']
+GAMEWEEK_CHIP_PLAYS_COLUMNS = ['gameweek', 'chip_name', 'num_played']
+GAMEWEEK_TOP_ELEMENT_COLUMNS = ['gameweek', 'element', 'points']
+GAMEWEEK_OVERRIDES_COLUMNS = ['gameweek', 'section', 'key', 'value']
+
 # --- Master playerstats schema - all 87 columns in proper order ---
 PLAYERSTATS_COLUMNS = [
     'id', 'status', 'chance_of_playing_next_round', 'chance_of_playing_this_round',
@@ -121,14 +164,20 @@ def ensure_playermatchstats_columns(df: pd.DataFrame) -> pd.DataFrame:
             df[col] = pd.NA
     return df[PLAYERMATCHSTATS_COLUMNS]
 
-def fetch_all_rows(supabase: Client, table_name: str) -> pd.DataFrame:
-    """Fetches all rows from a Supabase table, handling pagination."""
+def fetch_all_rows(supabase: Client, table_name: str, filters=None) -> pd.DataFrame:
+    """
+    Fetches all rows from a Supabase table, handling pagination. `filters` is an
+    optional list of (method, column, value) tuples such as ('eq', 'gw', 5).
+    """
     logger.info(f"Fetching latest data for '{table_name}'...")
     all_data = []
     offset = 0
     try:
         while True:
-            response = supabase.table(table_name).select("*").range(offset, offset + 1000 - 1).execute()
+            query = supabase.table(table_name).select("*")
+            for method, column, value in filters or []:
+                query = getattr(query, method)(column, value)
+            response = query.range(offset, offset + 1000 - 1).execute()
             batch_data = response.data
             all_data.extend(batch_data)
             if len(batch_data) < 1000:
@@ -141,11 +190,106 @@ def fetch_all_rows(supabase: Client, table_name: str) -> pd.DataFrame:
         logger.error(f"An error occurred while fetching from {table_name}: {e}")
         return pd.DataFrame()
 
-def calculate_discrete_gameweek_stats():
+def parse_nested_value(value):
+    """Returns a list/dict for values that arrive either as objects or as their Python-repr strings."""
+    if isinstance(value, (list, dict)):
+        return value
+    if isinstance(value, str) and value.strip():
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            logger.warning(f"  > Could not parse nested value: {value[:80]}")
+    return None
+
+def normalize_gameweek_summaries(gameweeks_df: pd.DataFrame):
+    """
+    Parses the nested chip_plays, top_element_info and overrides columns once and
+    splits them into typed child tables. Returns the scalar-only summary frame and
+    a dict of {filename: child_df}. overrides.pick_multiplier stays on the summary
+    as the scalar column 'pick_multiplier'.
+    """
+    chip_rows, top_rows, override_rows, pick_multipliers = [], [], [], []
+    for gw, chip_plays, top_info, overrides in zip(
+            gameweeks_df['id'],
+            gameweeks_df.get('chip_plays', pd.Series(None, index=gameweeks_df.index)),
+            gameweeks_df.get('top_element_info', pd.Series(None, index=gameweeks_df.index)),
+            gameweeks_df.get('overrides', pd.Series(None, index=gameweeks_df.index))):
+        for chip in parse_nested_value(chip_plays) or []:
+            chip_rows.append((gw, chip.get('chip_name'), chip.get('num_played')))
+
+        top_info = parse_nested_value(top_info)
+        if top_info:
+            top_rows.append((gw, top_info.get('id'), top_info.get('points')))
+
+        overrides = parse_nested_value(overrides) or {}
+        pick_multipliers.append(overrides.get('pick_multiplier'))
+        for section, entries in overrides.items():
+            if section == 'pick_multiplier':
+                continue
+            items = entries.items() if isinstance(entries, dict) else enumerate(entries or [])
+            for key, value in items:
+                if not isinstance(value, str):
+                    value = json.dumps(value)
+                override_rows.append((gw, section, str(key), value))
+
+    summary_df = gameweeks_df.drop(columns=GAMEWEEK_NESTED_COLS, errors='ignore')
+    summary_df['pick_multiplier'] = pd.to_numeric(pd.Series(pick_multipliers, index=summary_df.index, dtype=object))
+
+    chip_plays_df = pd.DataFrame(chip_rows, columns=GAMEWEEK_CHIP_PLAYS_COLUMNS)
+    chip_plays_df = chip_plays_df.astype({'gameweek': 'int64', 'chip_name': 'str', 'num_played': 'Int64'})
+    top_element_df = pd.DataFrame(top_rows, columns=GAMEWEEK_TOP_ELEMENT_COLUMNS).astype('Int64')
+    overrides_df = pd.DataFrame(override_rows, columns=GAMEWEEK_OVERRIDES_COLUMNS)
+    overrides_df = overrides_df.astype({'gameweek': 'int64', 'section': 'str', 'key': 'str', 'value': 'str'})
+
+    child_tables = {
+        'gameweek_chip_plays.csv': chip_plays_df.sort_values(['gameweek', 'chip_name'], ignore_index=True),
+        'gameweek_top_element.csv': top_element_df.sort_values('gameweek', ignore_index=True),
+        'gameweek_overrides.csv': overrides_df.sort_values(['gameweek', 'section', 'key'], ignore_index=True),
+    }
+    return summary_df, child_tables
+
+def build_match_dimension(match_ids: pd.Series) -> pd.DataFrame:
+    """
+    Builds the match dimension once from the distinct match_ids, parsing season,
+    tournament and home/away slugs with vectorized regex extraction. Each match
+    gets a compact integer 'match_key' (its row position) and each tournament a
+    'tournament_key' (-1 when no known tournament slug is found).
+    """
+    unique_ids = pd.Series(match_ids.dropna().astype(str).unique(), name='match_id')
+    dim = unique_ids.str.extract(MATCH_ID_PATTERN)
+
+    # Fall back to a plain substring search for ids that don't follow the usual layout
+    unparsed = dim['tournament'].isna()
+    if unparsed.any():
+        dim.loc[unparsed, 'tournament'] = unique_ids[unparsed].str.extract(f'({_TOURNAMENT_PATTERN})', expand=False)
+
+    dim.insert(0, 'match_id', unique_ids)
+    dim.insert(0, 'match_key', range(len(dim)))
+    dim['tournament_key'] = dim['tournament'].map(TOURNAMENT_KEYS).fillna(-1).astype('int16')
+    dim['match_key'] = dim['match_key'].astype('int32')
+    return dim
+
+def attach_match_keys(df: pd.DataFrame, match_dim: pd.DataFrame) -> pd.DataFrame:
+    """Adds integer 'match_key' and 'tournament_key' columns by hashing match_id against the dimension once."""
+    df = df.copy()
+    if 'match_id' not in df.columns:
+        df['match_key'] = pd.Series(dtype='int32')
+        df['tournament_key'] = pd.Series(dtype='int16')
+        return df
+    codes = pd.Categorical(df['match_id'], categories=match_dim['match_id']).codes
+    df['match_key'] = codes.astype('int32')
+    df['tournament_key'] = match_dim['tournament_key'].to_numpy()[codes]
+    df.loc[codes < 0, 'tournament_key'] = -1
+    return df
+
+def calculate_discrete_gameweek_stats(gameweeks=None):
     """
     Calculates discrete gameweek stats for both the main 'By Gameweek'
-    folders and all 'By Tournament' sub-folders.
+    folders and all 'By Tournament' sub-folders. If `gameweeks` is given, only
+    those gameweeks and the ones right after them (whose diffs depend on them)
+    are recalculated.
     """
+    targets = None if gameweeks is None else {gw for g in gameweeks for gw in (g, g + 1)}
     logger.info("\n--- 4. Calculating and Saving Discrete Gameweek Player Stats ---")
     by_gameweek_path = os.path.join(BASE_DATA_PATH, 'By Gameweek')
     by_tournament_path = os.path.join(BASE_DATA_PATH, 'By Tournament')
@@ -164,6 +308,8 @@ def calculate_discrete_gameweek_stats():
         gameweek_dirs = []
 
     for i, gw_dir in enumerate(gameweek_dirs):
+        if targets is not None and int(gw_dir[2:]) not in targets:
+            continue
         current_stats_path = os.path.join(by_gameweek_path, gw_dir, 'playerstats.csv')
         if not os.path.exists(current_stats_path):
             logger.warning(f"  > {gw_dir}: playerstats.csv not found, skipping.")
@@ -204,7 +350,7 @@ def calculate_discrete_gameweek_stats():
             output_df = merged_df[existing_final_cols]
 
         output_path = os.path.join(by_gameweek_path, gw_dir, output_filename)
-        output_df.to_csv(output_path, index=False)
+        write_csv(output_df, output_path)
         logger.info(f"  > Saved calculated stats for {gw_dir}.")
 
     # --- Part 2: Process 'By Tournament' folders ---
@@ -226,6 +372,8 @@ def calculate_discrete_gameweek_stats():
 
         for gw_dir in tournament_gw_dirs:
             gw_num = int(gw_dir[2:])
+            if targets is not None and gw_num not in targets:
+                continue
             current_stats_path = os.path.join(tournament_dir, gw_dir, 'playerstats.csv')
             if not os.path.exists(current_stats_path):
                 logger.warning(f"  > {tournament_name}/{gw_dir}: playerstats.csv not found, skipping.")
@@ -262,57 +410,61 @@ def calculate_discrete_gameweek_stats():
                 output_df = merged_df[existing_final_cols]
             
             output_path = os.path.join(tournament_dir, gw_dir, output_filename)
-            output_df.to_csv(output_path, index=False)
+            write_csv(output_df, output_path)
             logger.info(f"  > Saved calculated stats for {tournament_name}/{gw_dir}.")
 
 
-def main():
-    """
-    Runs the full, corrected data export pipeline with nuanced historical locking
-    based on the 'finished' status of a gameweek.
-    """
-    logger.info(f"--- Starting Comprehensive Data Update for Season {SEASON} ---")
-    logger.info(f"Timestamp: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+def fetch_tables(supabase: Client) -> dict:
+    """Fetches all six tables in full."""
+    return {name: fetch_all_rows(supabase, name) for name in TABLE_NAMES}
 
-    supabase = initialize_supabase_client()
+def has_essential_tables(tables: dict) -> bool:
+    """Every table except playermatchstats is required for an export."""
+    return not any(tables[name].empty for name in TABLE_NAMES if name != 'playermatchstats')
 
-    # --- Fetch ALL data at the beginning ---
-    gameweeks_df = fetch_all_rows(supabase, 'gameweeks')
-    players_df = fetch_all_rows(supabase, 'players')
-    playerstats_df = fetch_all_rows(supabase, 'playerstats')
-    teams_df = fetch_all_rows(supabase, 'teams')
-    matches_df = fetch_all_rows(supabase, 'matches')
-    playermatchstats_df = fetch_all_rows(supabase, 'playermatchstats')
-
-    essential_dfs = [gameweeks_df, players_df, playerstats_df, teams_df, matches_df]
-    if any(df.empty for df in essential_dfs):
-        logger.error("❌ Critical: One or more essential tables could not be fetched. Aborting.")
-        sys.exit(1)
+def export_tables(tables: dict, gameweeks=None):
+    """
+    Writes every output from the fetched tables. If `gameweeks` is given, only
+    those gameweeks' 'By Gameweek' and 'By Tournament' folders are rewritten;
+    the master files, quality report and player index are always refreshed.
+    """
+    gameweeks_df = tables['gameweeks']
+    players_df = tables['players']
+    playerstats_df = tables['playerstats']
+    teams_df = tables['teams']
+    matches_df = tables['matches']
+    playermatchstats_df = tables['playermatchstats']
 
     # --- Data Pre-processing ---
-    def extract_tournament_slug(match_id):
-        if not isinstance(match_id, str): return None
-        for slug in TOURNAMENT_NAME_MAP.keys():
-            if slug in match_id:
-                return slug
-        return None
-    matches_df['tournament'] = matches_df['match_id'].apply(extract_tournament_slug)
+    match_dim = build_match_dimension(matches_df['match_id'])
+    matches_df = attach_match_keys(matches_df, match_dim)
+    matches_df['tournament'] = matches_df['tournament_key'].map(dict(enumerate(TOURNAMENT_SLUGS)))
+    playermatchstats_df = attach_match_keys(playermatchstats_df, match_dim)
+
+    # --- Validate the fetched tables before anything is written ---
+    logger.info("\nRunning data quality checks...")
+    quality_results = run_checks(playerstats_df, matches_df, playermatchstats_df, NON_DECREASING_COLS, gameweeks_df)
+    write_report(quality_results, BASE_DATA_PATH, SEASON)
 
     logger.info("\nFiltering out friendlies and pre-season (GW0) matches...")
     initial_match_count = len(matches_df)
-    matches_df = matches_df[(matches_df['gameweek'] != 0) & (matches_df['tournament'] != 'friendly')]
+    friendly_key = TOURNAMENT_KEYS['friendly']
+    matches_df = matches_df[(matches_df['gameweek'] != 0) & (matches_df['tournament_key'] != friendly_key)]
     final_match_count = len(matches_df)
     logger.info(f"  > Removed {initial_match_count - final_match_count} matches. Processing {final_match_count} relevant matches.")
 
     # --- 1. Update Master Data Files (These are always the latest) ---
     logger.info("\n--- 1. Updating Master Data Files ---")
     os.makedirs(BASE_DATA_PATH, exist_ok=True)
-    gameweeks_df.to_csv(os.path.join(BASE_DATA_PATH, 'gameweek_summaries.csv'), index=False)
-    players_df.to_csv(os.path.join(BASE_DATA_PATH, 'players.csv'), index=False)
+    gameweek_summary_df, gameweek_child_tables = normalize_gameweek_summaries(gameweeks_df)
+    write_csv(gameweek_summary_df, os.path.join(BASE_DATA_PATH, 'gameweek_summaries.csv'))
+    for filename, child_df in gameweek_child_tables.items():
+        write_csv(child_df, os.path.join(BASE_DATA_PATH, filename))
+    write_csv(players_df, os.path.join(BASE_DATA_PATH, 'players.csv'))
     # Ensure playerstats has all columns in consistent order
     playerstats_normalized = ensure_playerstats_columns(playerstats_df)
-    playerstats_normalized.to_csv(os.path.join(BASE_DATA_PATH, 'playerstats.csv'), index=False)
-    teams_df.to_csv(os.path.join(BASE_DATA_PATH, 'teams.csv'), index=False)
+    write_csv(playerstats_normalized, os.path.join(BASE_DATA_PATH, 'playerstats.csv'))
+    write_csv(teams_df, os.path.join(BASE_DATA_PATH, 'teams.csv'))
     logger.info("  > Master files updated successfully.")
 
 
@@ -322,15 +474,18 @@ def main():
 
         gw_matches, gw_playermatchstats, gw_playerstats = gw_dfs
 
+        # Surrogate keys are internal to the pipeline and never written out
+        gw_matches = gw_matches.drop(columns=MATCH_KEY_COLS, errors='ignore')
+
         # Always write the dynamic data files
-        gw_matches.to_csv(os.path.join(gw_path, 'matches.csv'), index=False)
+        write_csv(gw_matches, os.path.join(gw_path, 'matches.csv'))
         # Ensure playermatchstats has all columns in consistent order
         gw_playermatchstats_normalized = ensure_playermatchstats_columns(gw_playermatchstats)
-        gw_playermatchstats_normalized.to_csv(os.path.join(gw_path, 'playermatchstats.csv'), index=False)
-        gw_matches.to_csv(os.path.join(gw_path, 'fixtures.csv'), index=False)
+        write_csv(gw_playermatchstats_normalized, os.path.join(gw_path, 'playermatchstats.csv'))
+        write_csv(gw_matches, os.path.join(gw_path, 'fixtures.csv'))
         # Ensure playerstats has all columns in consistent order
         gw_playerstats_normalized = ensure_playerstats_columns(gw_playerstats)
-        gw_playerstats_normalized.to_csv(os.path.join(gw_path, 'playerstats.csv'), index=False)
+        write_csv(gw_playerstats_normalized, os.path.join(gw_path, 'playerstats.csv'))
 
         players_path = os.path.join(gw_path, 'players.csv')
         teams_path = os.path.join(gw_path, 'teams.csv')
@@ -342,29 +497,31 @@ def main():
                 logger.info(f"  > Updating all files for open GW{gw}...")
             else:
                  logger.info(f"  > Writing final historical snapshot for newly finished GW{gw}...")
-            players_df.to_csv(players_path, index=False)
-            teams_df.to_csv(teams_path, index=False)
+            write_csv(players_df, players_path)
+            write_csv(teams_df, teams_path)
 
 
     # --- 2. Populate 'By Tournament' Folders ---
     logger.info("\n--- 2. Populating 'By Tournament' Folders ---")
-    unique_tournaments = matches_df['tournament'].dropna().unique()
-    for slug in unique_tournaments:
+    unique_tournament_keys = matches_df.loc[matches_df['tournament_key'] >= 0, 'tournament_key'].unique()
+    for tournament_key in unique_tournament_keys:
+        slug = TOURNAMENT_SLUGS[tournament_key]
         folder_name = TOURNAMENT_NAME_MAP.get(slug, slug.replace('-', ' ').title())
         logger.info(f"Processing Tournament: {folder_name}...")
         
-        tournament_matches = matches_df[matches_df['tournament'] == slug]
+        tournament_matches = matches_df[matches_df['tournament_key'] == tournament_key]
         gws_in_tournament = sorted(tournament_matches['gameweek'].dropna().unique().astype(int))
 
         for gw in gws_in_tournament:
             if gw not in gameweeks_df['id'].values: continue
+            if gameweeks is not None and gw not in gameweeks: continue
             
             is_finished = gameweeks_df.loc[gameweeks_df['id'] == gw, 'finished'].iloc[0]
             tournament_gw_path = os.path.join(BASE_DATA_PATH, 'By Tournament', folder_name, f'GW{gw}')
             
             gw_tournament_matches = tournament_matches[tournament_matches['gameweek'] == gw]
-            match_ids = gw_tournament_matches['match_id'].unique().tolist()
-            gw_tournament_playerstats = playermatchstats_df[playermatchstats_df['match_id'].isin(match_ids)]
+            match_keys = gw_tournament_matches['match_key'].to_numpy()
+            gw_tournament_playerstats = playermatchstats_df[playermatchstats_df['match_key'].isin(match_keys)]
             gw_tournament_playerstats_slice = playerstats_df[playerstats_df['gw'] == gw]
             
             write_gameweek_files(tournament_gw_path, gw, is_finished, (gw_tournament_matches, gw_tournament_playerstats, gw_tournament_playerstats_slice))
@@ -376,19 +533,286 @@ def main():
 
     for gw in unique_gameweeks:
         if gw not in gameweeks_df['id'].values: continue
+        if gameweeks is not None and gw not in gameweeks: continue
         
         is_finished = gameweeks_df.loc[gameweeks_df['id'] == gw, 'finished'].iloc[0]
         gw_path = os.path.join(BASE_DATA_PATH, 'By Gameweek', f'GW{gw}')
         
         gw_matches = matches_df[matches_df['gameweek'] == gw]
-        match_ids = gw_matches['match_id'].unique().tolist()
-        gw_playermatchstats = playermatchstats_df[playermatchstats_df['match_id'].isin(match_ids)]
+        match_keys = gw_matches['match_key'].to_numpy()
+        gw_playermatchstats = playermatchstats_df[playermatchstats_df['match_key'].isin(match_keys)]
         gw_playerstats_slice = playerstats_df[playerstats_df['gw'] == gw]
 
         write_gameweek_files(gw_path, gw, is_finished, (gw_matches, gw_playermatchstats, gw_playerstats_slice))
 
     # --- 4. Perform the discrete gameweek calculation ---
-    calculate_discrete_gameweek_stats()
+    calculate_discrete_gameweek_stats(gameweeks)
+
+    # --- 5. Maintain season and tournament aggregates from playermatchstats ---
+    logger.info("\n--- 5. Updating Player Aggregates ---")
+    match_info = matches_df.drop_duplicates('match_key').set_index('match_key')
+    tournament_names = {key: TOURNAMENT_NAME_MAP[slug] for key, slug in enumerate(TOURNAMENT_SLUGS)}
+    aggregate_input = playermatchstats_df[playermatchstats_df['match_key'].isin(match_info.index)].copy()
+    aggregate_input['gameweek'] = aggregate_input['match_key'].map(match_info['gameweek'])
+    aggregate_input['tournament'] = aggregate_input['tournament_key'].map(tournament_names)
+    update_player_aggregates(aggregate_input, BASE_DATA_PATH, PLAYERMATCHSTATS_COLUMNS)
+
+    # --- 6. Refresh the cross-season player index ---
+    logger.info("\n--- 6. Updating Cross-Season Player Index ---")
+    update_index()
+    flush_manifest()
+
+
+def _is_true(values: pd.Series) -> pd.Series:
+    """Reads boolean flags that may arrive as bools or as 'True'/'False' strings."""
+    return values.astype(str).str.lower() == 'true'
+
+def _row_signatures(df: pd.DataFrame, key_cols):
+    """Returns one hash per row, indexed by the row's key (last row wins on duplicate keys)."""
+    # Compare rendered rows so nested values and int/float drift don't need special handling
+    signatures = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    signatures = pd.Series(signatures, index=pd.MultiIndex.from_frame(df[key_cols].astype(str)), dtype=object)
+    return signatures[~signatures.index.duplicated(keep='last')]
+
+def merge_changed_rows(current: pd.DataFrame, incoming: pd.DataFrame, key_cols, scope=None):
+    """
+    Merges a fetch of one table into the cached copy. Returns the merged frame and
+    the changed rows: incoming rows that are new or differ from the cached version,
+    followed by cached rows whose key is gone from the fetch.
+
+    With `scope=None` the fetch is the whole table and replaces the cache. Otherwise
+    `scope` is a boolean mask of the cached rows the fetch covers (e.g. the current
+    gameweek's slice): those rows are replaced by `incoming`, the rest are kept.
+    """
+    if current.empty or not set(key_cols) <= set(current.columns):
+        return incoming.reset_index(drop=True), incoming
+
+    fetched = incoming
+    columns = current.columns.union(incoming.columns, sort=False)
+    current, incoming = current.reindex(columns=columns), incoming.reindex(columns=columns)
+    current_keys = pd.MultiIndex.from_frame(current[key_cols].astype(str))
+    incoming_keys = pd.MultiIndex.from_frame(incoming[key_cols].astype(str))
+
+    in_scope = np.ones(len(current), dtype=bool) if scope is None else np.asarray(scope, dtype=bool)
+    removed = current[in_scope & ~current_keys.isin(incoming_keys)]
+    previous = _row_signatures(current, key_cols).reindex(incoming_keys).to_numpy()
+    updated = incoming[previous != _row_signatures(incoming, key_cols).reindex(incoming_keys).to_numpy()]
+    changed = pd.concat([updated, removed], ignore_index=True)
+
+    if scope is None:
+        return fetched.reset_index(drop=True), changed
+
+    # Replace updated rows where they were, so unchanged outputs keep their row order
+    keep = ~in_scope & ~current_keys.isin(incoming_keys)
+    positions = pd.Series(range(len(current)), index=current_keys)
+    positions = positions[~positions.index.duplicated(keep='first')]
+    incoming_positions = positions.reindex(incoming_keys).to_numpy(dtype=float)
+    new_rows = pd.isna(incoming_positions)
+    incoming_positions[new_rows] = len(current) + np.arange(new_rows.sum())
+
+    merged = pd.concat([current[keep], incoming], ignore_index=True)
+    order = np.concatenate([np.flatnonzero(keep), incoming_positions])
+    merged = merged.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+    return merged, changed
+
+def affected_gameweeks(changes: dict, tables: dict, previous: dict) -> set:
+    """
+    Maps the changed rows of each table to the gameweeks whose files they touch,
+    both the gameweek a row is in now (`tables`) and the one it was cached
+    under before the merge (`previous`), so rows that move or vanish are
+    removed from their old gameweek's files too.
+    """
+    gameweeks_df = tables['gameweeks']
+    match_gws = [df.drop_duplicates('match_id', keep='last').set_index('match_id')['gameweek']
+                 for df in (tables['matches'], previous['matches']) if 'match_id' in df.columns]
+    affected = set()
+
+    def add(values):
+        affected.update(pd.to_numeric(values, errors='coerce').dropna().astype(int))
+
+    if not changes['gameweeks'].empty:
+        add(changes['gameweeks']['id'])
+    if not changes['playerstats'].empty:
+        add(changes['playerstats']['gw'])
+    for name in ('matches', 'playermatchstats'):
+        if changes[name].empty:
+            continue
+        if name == 'matches':
+            add(changes[name]['gameweek'])
+        for match_gw in match_gws:
+            add(changes[name]['match_id'].map(match_gw))
+    if not changes['players'].empty or not changes['teams'].empty:
+        # players.csv / teams.csv snapshots are only rewritten while a GW is open
+        add(gameweeks_df.loc[~_is_true(gameweeks_df['finished']), 'id'])
+    return affected
+
+def current_gameweek(tables: dict):
+    """Returns the id of the gameweek flagged is_current, or None."""
+    gameweeks_df = tables['gameweeks']
+    if gameweeks_df.empty or 'is_current' not in gameweeks_df.columns:
+        return None
+    current = gameweeks_df.loc[_is_true(gameweeks_df['is_current']), 'id']
+    return int(current.iloc[0]) if not current.empty else None
+
+def next_poll_delay(tables: dict, now: datetime) -> tuple:
+    """
+    Returns (seconds, is_live). The current gameweek is live once its deadline has
+    passed and until the gameweeks table flags it finished; a match that has
+    kicked off but not finished also counts. Unfinished matches usually have no
+    kickoff_time yet, so the gameweeks table is the main signal. Otherwise
+    idles until the next kickoff or gameweek deadline.
+    """
+    gameweeks_df, matches_df = tables['gameweeks'], tables['matches']
+    to_time = lambda values: pd.to_datetime(values, utc=True, errors='coerce', format='mixed')
+
+    deadlines = to_time(gameweeks_df['deadline_time']) if 'deadline_time' in gameweeks_df.columns else pd.Series(dtype='datetime64[ns, UTC]')
+    gw = current_gameweek(tables)
+    if gw is not None:
+        current = gameweeks_df['id'] == gw
+        current_finished = _is_true(gameweeks_df.loc[current, 'finished']).any()
+        current_deadline = deadlines[current].min() if not deadlines.empty else pd.NaT
+        if not current_finished and (pd.isna(current_deadline) or current_deadline <= now):
+            return LIVE_POLL_SECONDS, True
+
+    kickoffs = pd.Series(dtype='datetime64[ns, UTC]')
+    if not matches_df.empty and 'kickoff_time' in matches_df.columns:
+        kickoffs = to_time(matches_df['kickoff_time'])
+        finished = _is_true(matches_df['finished'])
+        in_current_gw = matches_df['gameweek'] == gw if gw is not None else pd.Series(True, index=matches_df.index)
+        if ((kickoffs <= now) & ~finished & in_current_gw).any():
+            return LIVE_POLL_SECONDS, True
+
+    upcoming = pd.concat([kickoffs, deadlines]).dropna()
+    upcoming = upcoming[upcoming > now]
+    if upcoming.empty:
+        return IDLE_POLL_SECONDS, False
+    until_next = (upcoming.min() - now).total_seconds()
+    return max(LIVE_POLL_SECONDS, min(IDLE_POLL_SECONDS, until_next)), False
+
+def fetch_live_tables(supabase: Client, tables: dict) -> dict:
+    """
+    Fetches only the current gameweek's slice of the fast-changing tables. Cached
+    matches of the gameweek that the slice no longer returns are looked up by id,
+    so a match moved to another gameweek is updated rather than dropped.
+    """
+    gw = current_gameweek(tables)
+    live = {
+        'gameweeks': fetch_all_rows(supabase, 'gameweeks'),
+        'playerstats': fetch_all_rows(supabase, 'playerstats', [('eq', 'gw', gw)]),
+        'matches': fetch_all_rows(supabase, 'matches', [('eq', 'gameweek', gw)]),
+    }
+    cached_matches = tables['matches']
+    if 'match_id' in cached_matches.columns and 'match_id' in live['matches'].columns:
+        cached_ids = cached_matches.loc[cached_matches['gameweek'] == gw, 'match_id']
+        missing = cached_ids[~cached_ids.isin(live['matches']['match_id'])].tolist()
+        if missing:
+            moved = fetch_all_rows(supabase, 'matches', [('in_', 'match_id', missing)])
+            if not moved.empty:
+                logger.info(f"  > {len(moved)} match(es) left GW{gw}: {moved['match_id'].tolist()}")
+                live['matches'] = pd.concat([live['matches'], moved], ignore_index=True)
+    match_ids = live['matches']['match_id'].tolist() if 'match_id' in live['matches'].columns else []
+    live['playermatchstats'] = fetch_all_rows(supabase, 'playermatchstats', [('in_', 'match_id', match_ids)]) if match_ids else pd.DataFrame()
+    return live
+
+def live_scopes(tables: dict, live: dict) -> dict:
+    """
+    Returns, per sliced table, a mask of the cached rows that a fetch_live_tables()
+    result covers. Cached rows inside the slice that the fetch no longer returns
+    were deleted upstream (moved matches are fetched by id, so they are not).
+    """
+    gw = current_gameweek(tables)
+    live_match_ids = live['matches']['match_id'] if 'match_id' in live['matches'].columns else pd.Series(dtype=object)
+    return {
+        'playerstats': tables['playerstats']['gw'] == gw,
+        'matches': tables['matches']['gameweek'] == gw,
+        'playermatchstats': tables['playermatchstats']['match_id'].isin(live_match_ids),
+    }
+
+def watch(supabase: Client, max_cycles=None, sleep=time.sleep, clock=lambda: datetime.now(timezone.utc)):
+    """
+    Keeps all six tables in memory and re-exports only the gameweeks touched by
+    changed, moved or deleted rows. While a gameweek is live, only its slice of
+    playerstats, matches and playermatchstats is re-fetched and replaced; every
+    table is re-fetched and replaced in full when idle or after FULL_REFRESH_SECONDS.
+    """
+    logger.info(f"--- Starting watch mode for Season {SEASON} ---")
+    tables = fetch_tables(supabase)
+    if not has_essential_tables(tables):
+        logger.error("❌ Critical: One or more essential tables could not be fetched. Aborting.")
+        sys.exit(1)
+    export_tables(tables)
+    last_full_refresh = clock()
+    delay, live = next_poll_delay(tables, clock())
+
+    cycle = 1
+    while max_cycles is None or cycle < max_cycles:
+        logger.info(f"\n--- Sleeping {int(delay)}s ({'live' if live else 'idle'}) ---")
+        sleep(delay)
+        cycle += 1
+        now = clock()
+
+        if live and (now - last_full_refresh).total_seconds() < FULL_REFRESH_SECONDS:
+            fetched = fetch_live_tables(supabase, tables)
+            scopes = live_scopes(tables, fetched)
+        else:
+            fetched, scopes = fetch_tables(supabase), {}
+            if not has_essential_tables(fetched):
+                logger.error("  > Full refresh incomplete, keeping cached state.")
+                fetched = {}
+            else:
+                last_full_refresh = now
+
+        previous = dict(tables)
+        changes = {name: pd.DataFrame() for name in TABLE_NAMES}
+        for name, incoming in fetched.items():
+            # A failed fetch comes back empty; never read that as every row being deleted
+            if incoming.empty:
+                continue
+            tables[name], changes[name] = merge_changed_rows(tables[name], incoming, TABLE_KEYS[name], scopes.get(name))
+
+        changed_counts = {name: len(df) for name, df in changes.items() if not df.empty}
+        if changed_counts:
+            gameweeks = affected_gameweeks(changes, tables, previous)
+            logger.info(f"  > Changed rows: {changed_counts}. Re-exporting GWs: {sorted(gameweeks)}")
+            export_tables(tables, gameweeks)
+        else:
+            logger.info("  > No changes since last poll.")
+        delay, live = next_poll_delay(tables, clock())
+
+
+def main():
+    """
+    Runs the full, corrected data export pipeline with nuanced historical locking
+    based on the 'finished' status of a gameweek. With --watch it keeps running
+    and re-exports only what changed.
+    """
+    parser = argparse.ArgumentParser(description="Export FPL data from Supabase to CSV.")
+    parser.add_argument('--watch', action='store_true', help="Keep running and poll for changes.")
+    parser.add_argument('--local-backend', metavar='DIR',
+                        help="Read tables from <DIR>/<table>.csv instead of Supabase (for testing).")
+    parser.add_argument('--max-cycles', type=int, help="Stop watch mode after this many polls.")
+    args = parser.parse_args()
+
+    if args.local_backend:
+        from local_backend import LocalClient
+        supabase = LocalClient(args.local_backend)
+    else:
+        supabase = initialize_supabase_client()
+
+    if args.watch:
+        watch(supabase, max_cycles=args.max_cycles)
+        return
+
+    logger.info(f"--- Starting Comprehensive Data Update for Season {SEASON} ---")
+    logger.info(f"Timestamp: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+
+    # --- Fetch ALL data at the beginning ---
+    tables = fetch_tables(supabase)
+    if not has_essential_tables(tables):
+        logger.error("❌ Critical: One or more essential tables could not be fetched. Aborting.")
+        sys.exit(1)
+
+    export_tables(tables)
 
     logger.info("\n--- Comprehensive data update process completed successfully! ---")
 
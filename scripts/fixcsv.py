@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 from pathlib import Path
+from csv_writer import write_csv, flush_manifest
 
 # Utility function to create directories
 def create_directory(path):
@@ -20,7 +21,7 @@ def update_matches_by_gameweek(season_path):
         gw_path = os.path.join(gw_base_path, f'GW{gw}')
         create_directory(gw_path)
         gw_matches = matches_df[matches_df['gameweek'] == gw]
-        gw_matches.to_csv(os.path.join(gw_path, 'matches.csv'), index=False)
+        write_csv(gw_matches, os.path.join(gw_path, 'matches.csv'))
         print(f"Updated GW{gw} with {len(gw_matches)} matches")
 
     return matches_df
@@ -52,7 +53,7 @@ def update_player_match_stats(season_path, matches_df):
         gw_path = os.path.join(gw_base_path, f'GW{gw}')
         create_directory(gw_path)
         gw_stats = stats_df[stats_df['gameweek'] == gw]
-        gw_stats.to_csv(os.path.join(gw_path, 'playermatchstats.csv'), index=False)
+        write_csv(gw_stats, os.path.join(gw_path, 'playermatchstats.csv'))
         print(f"Updated GW{gw} with {len(gw_stats)} player match stats")
 
 # Main execution function
@@ -66,6 +67,7 @@ def main():
 
     print("\nUpdating player match stats by gameweek...")
     update_player_match_stats(season_path, matches_df)
+    flush_manifest()
 
     print("\nProcessing complete.")
 
@@ -0,0 +1,52 @@
+import os
+import pandas as pd
+
+# A stand-in for the Supabase client that serves tables from <data_dir>/<table>.csv.
+# It supports the subset of the query builder used by export_data.fetch_all_rows
+# (select, eq, in_, range, execute) and re-reads the file on every execute, so
+# tests can edit the CSVs between watch-mode polls.
+
+
+class LocalResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class LocalQuery:
+    def __init__(self, path):
+        self.path = path
+        self.filters = []
+        self.start, self.end = 0, None
+
+    def select(self, columns="*"):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, [value]))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, list(values)))
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        if not os.path.exists(self.path):
+            return LocalResponse([])
+        df = pd.read_csv(self.path)
+        for column, values in self.filters:
+            df = df[df[column].isin(values)]
+        end = None if self.end is None else self.end + 1
+        df = df.iloc[self.start:end].astype(object)
+        return LocalResponse(df.where(df.notna(), None).to_dict(orient='records'))
+
+
+class LocalClient:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def table(self, table_name):
+        return LocalQuery(os.path.join(self.data_dir, f'{table_name}.csv'))
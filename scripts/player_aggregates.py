@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from csv_writer import write_csv
+
+# --- Configuration ---
+PARTIALS_FILENAME = 'player_gameweek_aggregates.csv'
+SEASON_FILENAME = 'player_season_aggregates.csv'
+TOURNAMENT_FILENAME = 'player_tournament_aggregates.csv'
+STATE_FILENAME = '.player_aggregates_state.json'
+# Bump when the partials' definition changes so every gameweek is re-aggregated once
+STATE_VERSION = 2
+
+GROUP_COLS = ['player_id', 'tournament', 'gameweek']
+# Columns that are identifiers, ratios or timestamps and can't be added up across matches
+NON_ADDITIVE_COLS = {'player_id', 'match_id', 'start_min', 'finish_min', 'top_speed'}
+MAX_COLS = ['top_speed']
+
+logger = logging.getLogger(__name__)
+
+
+def additive_columns(stat_cols):
+    """Returns the playermatchstats columns that are summed into the aggregates."""
+    return [col for col in stat_cols if col not in NON_ADDITIVE_COLS and not col.endswith('_percent')]
+
+
+def gameweek_fingerprints(pms_df, value_cols):
+    """
+    Returns {gameweek: fingerprint} for the playermatchstats rows of each gameweek.
+    Row hashes are summed per gameweek, so the fingerprint ignores row order.
+    """
+    row_hashes = pd.util.hash_pandas_object(pms_df[['player_id', 'match_id', 'tournament'] + value_cols], index=False)
+    grouped = pd.DataFrame({'gameweek': pms_df['gameweek'].to_numpy(), 'hash': row_hashes.to_numpy()}).groupby('gameweek')['hash']
+    sums, counts = grouped.sum(), grouped.size()
+    return {str(int(gw)): f"{int(sums[gw]):016x}-{int(counts[gw])}" for gw in sums.index}
+
+
+def build_partials(pms_df, sum_cols):
+    """Sums one or more gameweeks of playermatchstats into per-player, per-tournament, per-GW rows."""
+    grouped = pms_df.groupby(GROUP_COLS, sort=True)
+    # Unused substitutes get a playermatchstats row with 0 minutes; they didn't play
+    played = pms_df['match_id'].where(pms_df['minutes_played'] > 0) if 'minutes_played' in pms_df.columns else pms_df['match_id']
+    parts = [played.groupby([pms_df[col] for col in GROUP_COLS], sort=True).nunique().rename('matches_played'),
+             grouped[sum_cols].sum()]
+    parts += [grouped[col].max() for col in MAX_COLS if col in pms_df.columns]
+    # copy() consolidates the per-column blocks that groupby leaves behind
+    return pd.concat(parts, axis=1).copy().reset_index()
+
+
+def roll_up(partials, by, sum_cols):
+    """Rolls the per-GW partials up to `by` and adds per-90 rates based on minutes_played."""
+    grouped = partials.groupby(by, sort=True)
+    parts = [grouped[['matches_played'] + sum_cols].sum()]
+    parts += [grouped[col].max() for col in MAX_COLS if col in partials.columns]
+    totals = pd.concat(parts, axis=1)
+
+    if 'minutes_played' in totals.columns:
+        minutes = totals['minutes_played'].where(totals['minutes_played'] > 0)
+        per_90 = totals[[col for col in sum_cols if col != 'minutes_played']].div(minutes, axis=0) * 90
+        totals = pd.concat([totals, per_90.add_suffix('_per_90')], axis=1)
+    return totals.copy().reset_index()
+
+
+def update_player_aggregates(pms_df, output_dir, stat_cols):
+    """
+    Maintains season, per-tournament and per-90 player aggregates from
+    playermatchstats. `pms_df` must carry 'gameweek' and 'tournament' columns.
+    Per-GW partial sums are persisted; only gameweeks whose rows are new or
+    changed since the last run are re-aggregated, and the season and tournament
+    tables are rolled up from the partials.
+    """
+    if pms_df.empty:
+        logger.info("  > No playermatchstats rows; skipping aggregates.")
+        return
+
+    sum_cols = [col for col in additive_columns(stat_cols) if col in pms_df.columns]
+    value_cols = sum_cols + [col for col in MAX_COLS if col in pms_df.columns]
+
+    pms_df = pms_df.dropna(subset=['player_id', 'gameweek', 'tournament']).copy()
+    pms_df[value_cols] = pms_df[value_cols].apply(pd.to_numeric, errors='coerce').astype(float)
+    pms_df['player_id'] = pms_df['player_id'].astype(int)
+    pms_df['gameweek'] = pms_df['gameweek'].astype(int)
+
+    partials_path = os.path.join(output_dir, PARTIALS_FILENAME)
+    state_path = os.path.join(output_dir, STATE_FILENAME)
+    previous, partials = {}, pd.DataFrame(columns=GROUP_COLS)
+    if os.path.exists(partials_path) and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            previous, partials = state['gameweeks'], pd.read_csv(partials_path)
+
+    fingerprints = gameweek_fingerprints(pms_df, value_cols)
+    stale = {gw for gw in set(fingerprints) | set(previous) if fingerprints.get(gw) != previous.get(gw)}
+    stale_gws = np.array(sorted(int(gw) for gw in stale), dtype=int)
+
+    if len(stale_gws):
+        fresh = build_partials(pms_df[pms_df['gameweek'].isin(stale_gws)], sum_cols)
+        kept = partials[~partials['gameweek'].isin(stale_gws)]
+        partials = pd.concat([kept, fresh], ignore_index=True) if not kept.empty else fresh
+        partials = partials.sort_values(GROUP_COLS, ignore_index=True)
+        logger.info(f"  > Re-aggregated GWs {stale_gws.tolist()}.")
+    else:
+        logger.info("  > No new or revised matches; aggregates unchanged.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_csv(partials, partials_path)
+    write_csv(roll_up(partials, ['player_id'], sum_cols), os.path.join(output_dir, SEASON_FILENAME))
+    write_csv(roll_up(partials, ['player_id', 'tournament'], sum_cols), os.path.join(output_dir, TOURNAMENT_FILENAME))
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'gameweeks': fingerprints}, f, indent=0, sort_keys=True)
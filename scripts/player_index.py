@@ -0,0 +1,250 @@
+import os
+import io
+import csv
+import glob
+import json
+import hashlib
+import logging
+import pandas as pd
+
+# --- Configuration ---
+# Resolved from the repo root so the index works whatever the working directory is
+DATA_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+INDEX_PATH = os.path.join(DATA_ROOT, 'player_index.json')
+# Size/mtime of each indexed file, kept out of git (see .gitignore) because a fresh
+# checkout resets every mtime; the committed index records content hash and size.
+STAT_CACHE_PATH = os.path.join(DATA_ROOT, '.player_index_cache.json')
+
+# For each table: the column holding the season-specific player id, and the
+# candidate file layouts inside a season folder. The first pattern that matches
+# anything wins, so season master files are preferred over per-GW copies.
+TABLE_SOURCES = {
+    'players': ('player_id', ['players.csv', os.path.join('players', 'players.csv')]),
+    'playerstats': ('id', [
+        'playerstats.csv',
+        os.path.join('playerstats', 'playerstats.csv'),
+        os.path.join('By Gameweek', 'GW*', 'playerstats.csv'),
+    ]),
+    'playermatchstats': ('player_id', [
+        'playermatchstats.csv',
+        os.path.join('playermatchstats', 'playermatchstats.csv'),
+        os.path.join('By Gameweek', 'GW*', 'playermatchstats.csv'),
+    ]),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def list_seasons(data_root=DATA_ROOT):
+    """Returns the season folder names (e.g. '2024-2025') in chronological order."""
+    if not os.path.isdir(data_root):
+        return []
+    return sorted(d for d in os.listdir(data_root)
+                  if os.path.isdir(os.path.join(data_root, d)) and d[:4].isdigit())
+
+
+def resolve_table_files(season_path, table):
+    """Returns the files that hold `table` for one season, following TABLE_SOURCES."""
+    for pattern in TABLE_SOURCES[table][1]:
+        matches = glob.glob(os.path.join(season_path, pattern))
+        if matches:
+            return sorted(matches)
+    return []
+
+
+def _normalize_id(value):
+    """Turns '266', '266.0' or 266 into the canonical string key '266'."""
+    try:
+        return str(int(float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def scan_file_offsets(file_path, key_column):
+    """
+    Scans a CSV once and returns {player_id: [[start, end], ...]}, where each
+    pair is a byte range covering one or more consecutive rows of that player.
+    Quoted fields with embedded newlines are kept inside a single record.
+    """
+    ranges = {}
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        columns = next(csv.reader([header.decode('utf-8-sig')]))
+        if key_column not in columns:
+            return ranges
+        key_idx = columns.index(key_column)
+
+        offset = f.tell()
+        record, record_start = b'', offset
+        for line in f:
+            if not record:
+                record_start = offset
+            record += line
+            offset += len(line)
+            # An odd number of quotes means a quoted field continues on the next line
+            if record.count(b'"') % 2:
+                continue
+
+            row = next(csv.reader([record.decode('utf-8')]), None)
+            record = b''
+            if not row or key_idx >= len(row):
+                continue
+            player_id = _normalize_id(row[key_idx])
+            if player_id is None:
+                continue
+
+            player_ranges = ranges.setdefault(player_id, [])
+            if player_ranges and player_ranges[-1][1] == record_start:
+                player_ranges[-1][1] = offset
+            else:
+                player_ranges.append([record_start, offset])
+    return ranges
+
+
+def load_index(index_path=INDEX_PATH):
+    """Loads the persisted index, or returns an empty one if none exists yet."""
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'players': {}, 'files': {}}
+
+
+def save_index(index, index_path=INDEX_PATH):
+    """Writes the index as compact JSON."""
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True)
+
+
+def _load_stat_cache(cache_path):
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _file_signature(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _file_digest(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def update_index(data_root=DATA_ROOT, index_path=INDEX_PATH, cache_path=STAT_CACHE_PATH):
+    """
+    Brings the player index up to date. Only files whose content changed since
+    the last run are rescanned, so exporting a new gameweek costs one pass over
+    that gameweek's files. Files whose size and mtime match the local stat cache
+    are skipped without hashing; otherwise the content hash decides, which covers
+    files that were rewritten unchanged or freshly checked out.
+    """
+    index = load_index(index_path)
+    stat_cache = _load_stat_cache(cache_path)
+    seen_files = set()
+    rescanned = 0
+
+    for season in list_seasons(data_root):
+        season_path = os.path.join(data_root, season)
+        for table, (key_column, _) in TABLE_SOURCES.items():
+            for file_path in resolve_table_files(season_path, table):
+                rel_path = os.path.relpath(file_path, data_root).replace(os.sep, '/')
+                seen_files.add(rel_path)
+                signature = _file_signature(file_path)
+                entry = index['files'].get(rel_path)
+                if entry and 'size' in entry and stat_cache.get(rel_path) == signature:
+                    continue
+                digest = _file_digest(file_path)
+                stat_cache[rel_path] = signature
+                if entry and entry['sha1'] == digest and entry.get('size') == signature[0]:
+                    continue
+
+                index['files'][rel_path] = {
+                    'sha1': digest,
+                    'size': signature[0],
+                    'season': season,
+                    'table': table,
+                    'rows': scan_file_offsets(file_path, key_column),
+                }
+                rescanned += 1
+
+                if table == 'players':
+                    # Rebuild this season's mapping so players dropped from the file disappear
+                    for seasons in index['players'].values():
+                        seasons.pop(season, None)
+                    index['players'] = {code: seasons for code, seasons in index['players'].items() if seasons}
+                    players_df = pd.read_csv(file_path, usecols=['player_code', 'player_id'])
+                    for code, player_id in zip(players_df['player_code'], players_df['player_id']):
+                        code, player_id = _normalize_id(code), _normalize_id(player_id)
+                        if code is None or player_id is None:
+                            continue
+                        index['players'].setdefault(code, {})[season] = player_id
+
+    # Drop entries for files that no longer exist
+    for rel_path in list(index['files']):
+        if rel_path not in seen_files:
+            del index['files'][rel_path]
+    stat_cache = {rel_path: sig for rel_path, sig in stat_cache.items() if rel_path in seen_files}
+
+    save_index(index, index_path)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(stat_cache, f, separators=(',', ':'), sort_keys=True)
+    logger.info(f"  > Player index updated ({rescanned} file(s) rescanned, "
+                f"{len(index['players'])} players tracked).")
+    return index
+
+
+def get_player_history(player_code, table, index=None, data_root=DATA_ROOT):
+    """
+    Returns every row of `table` for the player identified by `player_code`
+    across all indexed seasons, with an extra 'season' column. Only the byte
+    ranges recorded in the index are read from disk; a file whose size no
+    longer matches the index raises RuntimeError instead of returning misaligned rows.
+    """
+    if index is None:
+        index_path = os.path.join(data_root, 'player_index.json')
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Player index not found at {index_path}. Run scripts/player_index.py first.")
+        index = load_index(index_path)
+    seasons = index['players'].get(_normalize_id(player_code), {})
+
+    frames = []
+    for rel_path, entry in sorted(index['files'].items()):
+        if entry['table'] != table or entry['season'] not in seasons:
+            continue
+        player_ranges = entry['rows'].get(seasons[entry['season']])
+        if not player_ranges:
+            continue
+
+        file_path = os.path.join(data_root, rel_path)
+        # The byte ranges are only valid for the exact file that was scanned
+        if os.path.getsize(file_path) != entry.get('size'):
+            raise RuntimeError(f"{rel_path} changed since the player index was built. "
+                               f"Run scripts/player_index.py to refresh it.")
+        with open(file_path, 'rb') as f:
+            chunks = [f.readline()]
+            for start, end in player_ranges:
+                f.seek(start)
+                chunks.append(f.read(end - start))
+        df = pd.read_csv(io.BytesIO(b''.join(chunks)))
+        df['season'] = entry['season']
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logger.info("--- Updating cross-season player index ---")
+    update_index()
+
+
+if __name__ == "__main__":
+    main()
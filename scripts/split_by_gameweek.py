@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 import sys
+from csv_writer import write_csv, flush_manifest
+from data_quality import check_match_references
 
 def main():
     # File paths
@@ -48,7 +50,7 @@ def main():
             
             # Save matches for this gameweek
             output_file = gw_folder / "matches.csv"
-            gw_matches.to_csv(output_file, index=False)
+            write_csv(gw_matches, output_file)
             print(f"   📁 GW{gw}: {len(gw_matches)} matches → {output_file}")
         
         # Read and split player stats
@@ -59,6 +61,13 @@ def main():
         # Add gameweek column to player stats using match_id mapping
         playerstats_df['gameweek'] = playerstats_df['match_id'].map(match_gameweek_map)
         
+        # Flag player stats that point at matches missing from the matches file
+        reference_check = check_match_references(playerstats_df, matches_df)
+        if reference_check['status'] == 'fail':
+            print(f"   ⚠️  Warning: {reference_check['violations']} records reference "
+                  f"{reference_check['distinct_match_ids']} unknown match_id(s), "
+                  f"e.g. {reference_check['examples'][0]['match_id']}")
+
         # Check for unmapped records
         unmapped_count = playerstats_df['gameweek'].isna().sum()
         if unmapped_count > 0:
@@ -83,9 +92,10 @@ def main():
                 
                 # Save player stats for this gameweek
                 output_file = gw_folder / "playermatchstats.csv"
-                gw_stats_clean.to_csv(output_file, index=False)
+                write_csv(gw_stats_clean, output_file)
                 print(f"   📁 GW{gw}: {len(gw_stats)} player records → {output_file}")
         
+        flush_manifest()
         print("\n✅ Split completed successfully!")
         print("\n📊 Summary:")
         print(f"   Created folders for {len(gameweeks)} gameweeks")
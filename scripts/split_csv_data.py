@@ -2,6 +2,8 @@ import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from csv_writer import write_csv, flush_manifest
+from data_quality import check_match_references
 
 def create_directory(path):
     """Create directory if it doesn't exist"""
@@ -52,7 +54,7 @@ def update_matches_by_gameweek(season_path, latest_finished_gameweek):
             create_directory(gw_path)
 
             gw_matches = matches_df[matches_df['gameweek'] == gw]
-            gw_matches.to_csv(os.path.join(gw_path, 'matches.csv'), index=False)
+            write_csv(gw_matches, os.path.join(gw_path, 'matches.csv'))
             print(f"Updated GW{gw} with {len(gw_matches)} matches")
         else:
             print(f"Skipping GW{gw} (before latest finished gameweek).")
@@ -71,6 +73,13 @@ def update_player_match_stats(season_path, matches_df, latest_finished_gameweek)
 
     gw_base_path = os.path.join(season_path, 'playermatchstats', 'gameweeks')
 
+    # Flag player stats that point at matches missing from matches.csv
+    reference_check = check_match_references(stats_df, matches_df)
+    if reference_check['status'] == 'fail':
+        print(f"Warning: {reference_check['violations']} player match stats reference "
+              f"{reference_check['distinct_match_ids']} unknown match_id(s), "
+              f"e.g. {reference_check['examples'][0]['match_id']}")
+
     # Create match_id to gameweek mapping
     match_to_gw = dict(zip(matches_df['match_id'], matches_df['gameweek']))
     stats_df['gameweek'] = stats_df['match_id'].map(match_to_gw)
@@ -105,7 +114,7 @@ def update_player_match_stats(season_path, matches_df, latest_finished_gameweek)
         if gw_int >= latest_finished_gameweek:
             # Merge and update
             updated_gw_stats = pd.concat([existing_gw_stats_df, gw_stats]).drop_duplicates(subset=['player_id', 'match_id'], keep='last')
-            updated_gw_stats.to_csv(existing_gw_stats_path, index=False)
+            write_csv(updated_gw_stats, existing_gw_stats_path)
             print(f"Updated GW{gw_int} with {len(updated_gw_stats)} player stats")
 
             for match_id in gw_stats['match_id'].unique():
@@ -131,7 +140,7 @@ def update_player_match_stats(season_path, matches_df, latest_finished_gameweek)
 
                 # Merge and update
                 updated_match_stats = pd.concat([existing_match_stats_df, match_stats]).drop_duplicates(subset=['player_id', 'match_id'], keep='last')
-                updated_match_stats.to_csv(match_stats_path, index=False)
+                write_csv(updated_match_stats, match_stats_path)
                 print(f"  - Updated Match {match_id_str} in GW{gw_int} with {len(updated_match_stats)} player stats")
         else:
             print(f"Skipping GW{gw_int} (before latest finished gameweek).")
@@ -171,14 +180,14 @@ def update_player_stats(season_path, latest_finished_gameweek):
             if gw >= latest_finished_gameweek:
                 # Merge data, keeping the latest
                 updated_gw_stats = pd.concat([existing_gw_stats_df, gw_stats]).drop_duplicates(subset=['id', 'gw'], keep='last')
-                updated_gw_stats.to_csv(existing_gw_stats_path, index=False)
+                write_csv(updated_gw_stats, existing_gw_stats_path)
                 print(f"Updated GW{gw} with {len(updated_gw_stats)} player stats")
             else:
                 print(f"Skipping GW{gw} (before latest finished gameweek).")
         else:
             # Only create if it's a new gameweek that should be processed
             if gw >= latest_finished_gameweek:
-                gw_stats.to_csv(os.path.join(gw_path, 'playerstats.csv'), index=False)
+                write_csv(gw_stats, os.path.join(gw_path, 'playerstats.csv'))
                 print(f"Created GW{gw} with {len(gw_stats)} player stats")
             else:
                 print(f"Skipping GW{gw} (before latest finished gameweek).")
@@ -207,6 +216,7 @@ def main():
         # Update player stats
         print("\nUpdating player stats by gameweek...")
         update_player_stats(season_path, latest_finished_gameweek)
+        flush_manifest()
     else:
         print("\nNo finished gameweeks found, skipping update process.")
 
@@ -0,0 +1,140 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import tempfile
+import pandas as pd
+import csv_writer
+
+# Checks csv_writer.write_csv on a season's gameweek and tournament files:
+#   - every file matches DataFrame.to_csv byte for byte on the first write, on
+#     the write that records the fingerprint, and on the write that is skipped;
+#   - a manifest entry without a fingerprint is filled in, not skipped;
+#   - a frame whose values change but whose CSV keeps the same size is rewritten;
+#   - a file edited outside the writer is rewritten.
+# Exits non-zero on any failure so it can gate CI.
+SEASON = sys.argv[1] if len(sys.argv) > 1 else "2025-2026"
+SEASON_PATH = os.path.join('data', SEASON)
+
+
+def load_frames():
+    """Reads every per-gameweek CSV of the season into memory, keyed by relative path."""
+    frames = {}
+    for path in sorted(glob.glob(os.path.join(SEASON_PATH, 'By *', '**', '*.csv'), recursive=True)):
+        frames[os.path.relpath(path, SEASON_PATH)] = pd.read_csv(path)
+    return frames
+
+
+def write_tree(frames, out_dir, use_writer):
+    """Writes every frame under out_dir and returns how many files write_csv actually wrote."""
+    written = 0
+    for rel_path, df in frames.items():
+        path = os.path.join(out_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if use_writer:
+            written += csv_writer.write_csv(df, path)
+        else:
+            df.to_csv(path, index=False)
+    return written
+
+
+def compare_trees(expected_dir, actual_dir, rel_paths):
+    """Returns the relative paths whose bytes differ between the two output trees."""
+    mismatches = []
+    for rel_path in rel_paths:
+        with open(os.path.join(expected_dir, rel_path), 'rb') as f:
+            expected = f.read()
+        with open(os.path.join(actual_dir, rel_path), 'rb') as f:
+            actual = f.read()
+        if expected != actual:
+            mismatches.append(rel_path)
+    return mismatches
+
+
+def same_size_edit(df):
+    """Returns a copy of df with one integer cell changed by a single digit, or None."""
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_integer_dtype(values) and len(values):
+            edited = df.copy()
+            value = int(values.iloc[0])
+            edited.loc[edited.index[0], col] = value + 1 if value % 10 != 9 else value - 1
+            return edited
+    return None
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def main():
+    if not os.path.isdir(SEASON_PATH):
+        print(f"❌ Error: Season folder not found: {SEASON_PATH}")
+        sys.exit(1)
+
+    frames = load_frames()
+    print(f"Checking {len(frames)} CSV files from {SEASON_PATH}")
+
+    work_dir = tempfile.mkdtemp()
+    ok = True
+    try:
+        expected_dir = os.path.join(work_dir, 'to_csv')
+        actual_dir = os.path.join(work_dir, 'write_csv')
+        csv_writer.MANIFEST_PATH = os.path.join(work_dir, 'manifest.json')
+        csv_writer._manifest = None
+        write_tree(frames, expected_dir, use_writer=False)
+
+        # First write: no manifest entry, so every file is written and no fingerprint recorded
+        written = write_tree(frames, actual_dir, use_writer=True)
+        ok &= check(written == len(frames), f"first write wrote {written}/{len(frames)} files")
+        ok &= check(all(entry['fingerprint'] is None for entry in csv_writer._manifest.values()),
+                    "first write records no fingerprints")
+        ok &= check(not compare_trees(expected_dir, actual_dir, frames), "first write is byte-identical to to_csv")
+
+        # Second write: entries without a fingerprint are filled in, never skipped
+        csv_writer.flush_manifest()
+        csv_writer._manifest = None
+        with open(csv_writer.MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            ok &= check(all(entry['fingerprint'] is None for entry in json.load(f).values()),
+                        "persisted manifest reloads with empty fingerprints")
+        written = write_tree(frames, actual_dir, use_writer=True)
+        ok &= check(written == len(frames), f"entries without a fingerprint were rewritten ({written}/{len(frames)})")
+        missing = [key for key, entry in csv_writer._manifest.items() if entry['fingerprint'] is None]
+        ok &= check(not missing, f"fingerprints recorded for all files ({len(missing)} missing)")
+        ok &= check(not compare_trees(expected_dir, actual_dir, frames), "fingerprinting write is byte-identical to to_csv")
+
+        # Third write: nothing changed, so nothing is written
+        written = write_tree(frames, actual_dir, use_writer=True)
+        ok &= check(written == 0, f"unchanged frames were skipped ({written} written)")
+        ok &= check(not compare_trees(expected_dir, actual_dir, frames), "skipped files still match to_csv")
+
+        # A changed value that keeps the CSV the same size must still be written
+        rel_path, edited = next(((p, e) for p, e in ((p, same_size_edit(df)) for p, df in frames.items())
+                                 if e is not None), (None, None))
+        if check(rel_path is not None, "found a frame with an integer column to edit"):
+            path = os.path.join(actual_dir, rel_path)
+            size_before = os.path.getsize(path)
+            rewritten = csv_writer.write_csv(edited, path)
+            with open(path, 'rb') as f:
+                ok &= check(rewritten and f.read() == edited.to_csv(index=False).encode()
+                            and os.path.getsize(path) == size_before,
+                            f"same-size value change rewritten ({rel_path})")
+
+            # An external edit changes the size on disk; the next write restores the file
+            with open(path, 'ab') as f:
+                f.write(b'\n')
+            rewritten = csv_writer.write_csv(edited, path)
+            with open(path, 'rb') as f:
+                ok &= check(rewritten and f.read() == edited.to_csv(index=False).encode(),
+                            "externally edited file rewritten")
+    finally:
+        shutil.rmtree(work_dir)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
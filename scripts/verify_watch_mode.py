@@ -0,0 +1,150 @@
+import os
+import sys
+import glob
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import csv_writer
+import player_index
+import export_data
+from local_backend import LocalClient
+
+# Drives export_data.watch() against a local backend built from the committed
+# season files, with a fake clock inside the live window of an open gameweek:
+#   - the unmodified tables poll at LIVE_POLL_SECONDS;
+#   - matches moved out of the live gameweek mid-gameweek (one unplayed, one
+#     with playermatchstats) land in their new gameweek and leave the old one;
+#   - a playermatchstats row deleted upstream during a live poll disappears;
+#   - the output ends up byte-identical to a one-shot export of the final state.
+# Exits non-zero on any failure so it can gate CI.
+SEASON_PATH = os.path.join('data', export_data.SEASON)
+LIVE_GW = 16
+MOVED_TO_GW = 30
+# Inside GW16's live window: after its deadline, before the gameweek finished
+LIVE_NOW = datetime(2025, 12, 14, 12, 0, tzinfo=timezone.utc)
+
+
+def build_backend(backend_dir):
+    """Rebuilds the six Supabase tables as <table>.csv files from the committed season data."""
+    os.makedirs(backend_dir, exist_ok=True)
+
+    def concat(filename, drop=()):
+        files = sorted(glob.glob(os.path.join(SEASON_PATH, 'By Gameweek', 'GW*', filename)))
+        df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+        return df.drop(columns=list(drop), errors='ignore').drop_duplicates()
+
+    pd.read_csv(os.path.join(SEASON_PATH, 'gameweek_summaries.csv')).to_csv(os.path.join(backend_dir, 'gameweeks.csv'), index=False)
+    for table in ('players', 'playerstats', 'teams'):
+        pd.read_csv(os.path.join(SEASON_PATH, f'{table}.csv')).to_csv(os.path.join(backend_dir, f'{table}.csv'), index=False)
+    concat('matches.csv', ['tournament']).to_csv(os.path.join(backend_dir, 'matches.csv'), index=False)
+    concat('playermatchstats.csv').to_csv(os.path.join(backend_dir, 'playermatchstats.csv'), index=False)
+
+
+def use_output_dir(out_dir):
+    """Points every writer at out_dir: outputs, CSV manifest and player index."""
+    csv_writer._manifest = None
+    os.makedirs(out_dir, exist_ok=True)
+    os.chdir(out_dir)
+    data_root = os.path.join(out_dir, 'data')
+    export_data.update_index = lambda: player_index.update_index(
+        data_root, os.path.join(data_root, 'player_index.json'), os.path.join(data_root, '.player_index_cache.json'))
+
+
+def gameweek_match_ids(out_dir, gw, filename='matches.csv'):
+    path = os.path.join(out_dir, SEASON_PATH, 'By Gameweek', f'GW{gw}', filename)
+    return set(pd.read_csv(path)['match_id']) if os.path.exists(path) else set()
+
+
+def compare_outputs(expected_dir, actual_dir):
+    """Returns the CSV paths that are missing from either tree or differ between them."""
+    list_csvs = lambda root: {os.path.relpath(p, root) for p in glob.glob(os.path.join(root, 'data', '**', '*.csv'), recursive=True)}
+    expected, actual = list_csvs(expected_dir), list_csvs(actual_dir)
+    mismatches = sorted(expected ^ actual)
+    for rel_path in sorted(expected & actual):
+        with open(os.path.join(expected_dir, rel_path), 'rb') as f:
+            expected_bytes = f.read()
+        with open(os.path.join(actual_dir, rel_path), 'rb') as f:
+            if f.read() != expected_bytes:
+                mismatches.append(rel_path)
+    return mismatches
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def main():
+    if not os.path.isdir(SEASON_PATH):
+        print(f"❌ Error: Season folder not found: {SEASON_PATH}")
+        sys.exit(1)
+    # export_data configures INFO logging on import; only warnings matter here
+    logging.getLogger().setLevel(logging.WARNING)
+
+    work_dir = tempfile.mkdtemp()
+    repo_dir = os.getcwd()
+    backend_dir = os.path.join(work_dir, 'backend')
+    watch_dir, oneshot_dir = os.path.join(work_dir, 'watch'), os.path.join(work_dir, 'oneshot')
+    backend = LocalClient(backend_dir)
+    ok = True
+    try:
+        build_backend(backend_dir)
+        matches = pd.read_csv(os.path.join(backend_dir, 'matches.csv'))
+        pms = pd.read_csv(os.path.join(backend_dir, 'playermatchstats.csv'))
+        live_matches = matches[matches['gameweek'] == LIVE_GW]
+        unplayed = live_matches.loc[~live_matches['finished'].astype(bool), 'match_id'].iloc[0]
+        played = live_matches.loc[live_matches['match_id'].isin(pms['match_id']), 'match_id']
+        moved_played, edited_match = played.iloc[0], played.iloc[1]
+
+        polls, exports = [], []
+        export_tables = export_data.export_tables
+        export_data.export_tables = lambda tables, gameweeks=None: (exports.append(gameweeks), export_tables(tables, gameweeks))
+        state = {'offset': timedelta(0)}
+
+        def sleep(seconds):
+            polls.append(seconds)
+            state['offset'] += timedelta(seconds=seconds)
+            if len(polls) == 1:
+                moved = matches.copy()
+                moved.loc[moved['match_id'].isin([unplayed, moved_played]), 'gameweek'] = MOVED_TO_GW
+                moved.to_csv(os.path.join(backend_dir, 'matches.csv'), index=False)
+            elif len(polls) == 2:
+                dropped = pms.index[pms['match_id'] == edited_match][0]
+                pms.drop(index=dropped).to_csv(os.path.join(backend_dir, 'playermatchstats.csv'), index=False)
+
+        use_output_dir(watch_dir)
+        export_data.watch(backend, max_cycles=3, sleep=sleep, clock=lambda: LIVE_NOW + state['offset'])
+        csv_writer._manifest = None
+
+        ok &= check(polls and all(delay == export_data.LIVE_POLL_SECONDS for delay in polls),
+                    f"open GW{LIVE_GW} polls at {export_data.LIVE_POLL_SECONDS}s on unmodified data (delays: {polls})")
+        ok &= check(len(exports) == 3 and exports[1] is not None and {LIVE_GW, MOVED_TO_GW} <= set(exports[1]),
+                    f"moving matches out of GW{LIVE_GW} re-exports GW{LIVE_GW} and GW{MOVED_TO_GW} (got {exports[1:2]})")
+        ok &= check(not {unplayed, moved_played} & gameweek_match_ids(watch_dir, LIVE_GW),
+                    f"moved matches left GW{LIVE_GW}/matches.csv")
+        ok &= check({unplayed, moved_played} <= gameweek_match_ids(watch_dir, MOVED_TO_GW),
+                    f"moved matches are in GW{MOVED_TO_GW}/matches.csv")
+        ok &= check(moved_played in gameweek_match_ids(watch_dir, MOVED_TO_GW, 'playermatchstats.csv'),
+                    f"playermatchstats of {moved_played} followed it to GW{MOVED_TO_GW}")
+        ok &= check(len(exports) == 3 and exports[2] == {LIVE_GW},
+                    f"deleting a live playermatchstats row re-exports GW{LIVE_GW} only (got {exports[2:3]})")
+
+        # Whatever watch mode did incrementally must match a fresh export of the final state
+        export_data.export_tables = export_tables
+        use_output_dir(oneshot_dir)
+        export_tables(export_data.fetch_tables(backend))
+        mismatches = compare_outputs(oneshot_dir, watch_dir)
+        ok &= check(not mismatches, f"watch output matches a one-shot export ({len(mismatches)} file(s) differ"
+                                    f"{', e.g. ' + mismatches[0] if mismatches else ''})")
+    finally:
+        os.chdir(repo_dir)
+        shutil.rmtree(work_dir)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()